@@ -1,22 +1,99 @@
 import os
+import re
+import logging
+import asyncio
+import random
+import time
+import hashlib
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from google import genai
-from google.genai import types
+from google.genai import types, errors
 import json
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+import numpy as np
+import cv2
+from response_cache import ResponseCache, CACHE_VERSION, dhash
+from memory_service import MemoryService
 
 load_dotenv()
 
+log = logging.getLogger("gemini")
+
+# Transient failures (rate limit, overload) worth another attempt within the same frame.
+RETRYABLE_CODES = (429, 500, 503, 504)
+RETRY_INITIAL_DELAY = 0.05
+RETRY_MAX_DELAY = 0.5
+# Give up retrying well inside one control period; a late answer is as bad as STOP.
+RETRY_DEADLINE_SECONDS = 0.4
+
+# Gemini downsamples images to ~768px internally; larger uploads only cost bandwidth.
+MAX_IMAGE_SIDE = 768
+# Frames already below this size are forwarded untouched.
+REENCODE_THRESHOLD_BYTES = 64 * 1024
+REENCODE_QUALITY = 75
+
+# Motor-relevant fields, matched against the partial streamed JSON. Numbers only count
+# once a delimiter follows them, so a half-streamed "1" of "1.5" is not taken early.
+EARLY_FIELD_PATTERNS = {
+    "command": re.compile(r'"command"\s*:\s*"([A-Z_]+)"'),
+    "speed": re.compile(r'"speed"\s*:\s*(-?\d+(?:\.\d+)?)\s*[,}]'),
+    "duration": re.compile(r'"duration"\s*:\s*(-?\d+(?:\.\d+)?)\s*[,}]'),
+}
+
+# Upper bound on simultaneous generate_content calls from this process.
+MAX_CONCURRENT_REQUESTS = 4
+
+# JPEG decode/resize/encode release the GIL; running them here keeps the event loop free.
+IMAGE_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="gemini-image")
+
+# Distance bands (upper bound in mm) matching the thresholds the navigation rules use.
+# The model does not act differently on 447 vs 453mm, so it only sees the band.
+# Every edge the rules mention (200/300/400/500/1000mm) is a band boundary.
+DISTANCE_BANDS = (
+    (200, "DANGER"), (300, "TIGHT"), (400, "CLOSE"), (500, "NEAR"), (1000, "CAUTION"),
+)
+CLEAR_DIST_MM = 2000
+
+
+def image_mime(image_bytes):
+    """MIME type of an uploaded frame; clients send JPEG or, opted in, WebP."""
+    if image_bytes[:4] == b"RIFF" and image_bytes[8:12] == b"WEBP":
+        return "image/webp"
+    return "image/jpeg"
 
-class GeminiService:
-    def __init__(self):
-        self.api_key = os.environ.get("GEMINI_API_KEY")
-        if not self.api_key:
-            print("Warning: GEMINI_API_KEY environment variable not set.")
-        
-        self.client = genai.Client(api_key=self.api_key)
-        self.model_name = "gemini-robotics-er-1.5-preview"
 
-        self.system_instruction = """
+def distance_label(dist):
+    """Maps a sector's closest distance (mm, None for no return) to its band."""
+    if dist is None or dist > CLEAR_DIST_MM:
+        return "CLEAR"
+    for limit, label in DISTANCE_BANDS:
+        if dist < limit:
+            return label
+    return "OK"
+
+
+LIDAR_TEXT_TEMPLATE = (
+    "LIDAR READINGS:\n"
+    "- FRONT (345°-15°): {f}\n"
+    "- RIGHT (75°-105°): {r}\n"
+    "- BACK (165°-195°): {b}\n"
+    "- LEFT (255°-285°): {l}"
+)
+
+# LiDAR-only fast path: scans this clear, or this boxed in, need no model call.
+REFLEX_CLEAR_FRONT_MM = 1000
+REFLEX_CLEAR_SIDE_MM = 500
+REFLEX_BLOCKED_FRONT_MM = 200
+REFLEX_BLOCKED_SIDE_MM = 300
+
+
+# System instruction, split into sections so variants can be composed from one source.
+PROMPT_ROLE = """\
 You are the advanced control system for a MyAGV robot with DUAL SENSOR INPUT.
 You receive:
 1. **RGB Camera Image:** Front-facing visual view.
@@ -24,51 +101,60 @@ You receive:
 
 **Your Goal:**
 Navigate safely and intelligently using the LIDAR DATA as the primary source of truth for distances, and RGB for object identification only.
+"""
 
+PROMPT_LIDAR_FORMAT = """\
 **LiDAR Data Format:**
 You will receive text like:
 ```
 LIDAR READINGS:
-- FRONT (345°-15°): 450mm (closest at 2°)
-- RIGHT (75°-105°): 1200mm (closest at 88°)
-- BACK (165°-195°): CLEAR (>2000mm)
-- LEFT (255°-285°): 800mm (closest at 270°)
+- FRONT (345°-15°): NEAR@2°
+- RIGHT (75°-105°): OK@88°
+- BACK (165°-195°): CLEAR
+- LEFT (255°-285°): CAUTION@270°
 ```
-- Distance in **millimeters (mm)**. 
-- "CLEAR" means no obstacle within 2 meters.
-- Use these values DIRECTLY for navigation decisions.
+Each sector reports the closest obstacle as a distance band and its angle:
+- DANGER: < 200mm
+- TIGHT: 200-300mm
+- CLOSE: 300-400mm
+- NEAR: 400-500mm
+- CAUTION: 500-1000mm
+- OK: 1000-2000mm
+- CLEAR: no obstacle within 2 meters.
+- Use these bands DIRECTLY for navigation decisions.
+"""
 
+PROMPT_NAV_LOGIC = """\
 **Navigation Logic (LiDAR DRIVEN):**
-1. **FRONT < 200mm:** STOP or TURN. Too close!
-2. **FRONT 200-500mm:** Slow down (speed 10-20), consider STRAFE if sides are clear.
-3. **FRONT 500-1000mm:** Caution, proceed at speed 30-40.
-4. **FRONT > 1000mm:** Safe to proceed at speed 50+.
-5. **Always check the SIDE you want to STRAFE towards.** If that side < 300mm, do not strafe there.
+1. **FRONT DANGER:** STOP or TURN. Too close!
+2. **FRONT TIGHT, CLOSE or NEAR:** Slow down (speed 10-20), consider STRAFE if sides are clear.
+3. **FRONT CAUTION:** Caution, proceed at speed 30-40.
+4. **FRONT OK or CLEAR:** Safe to proceed at speed 50+.
+5. **Always check the SIDE you want to STRAFE towards.** If that side is DANGER or TIGHT, do not strafe there.
+"""
 
+PROMPT_ROBOT_SPECS = """\
 **Robot Physical Specifications:**
 - Size: 36 cm x 26 cm
 - Drive Type: MECANUM WHEELS (Omnidirectional)
 - Max Speed: 0.9 m/s (Speed 100)
+"""
 
+PROMPT_SPEED_CAL = """\
 **Speed & Distance Calibration:**
 - speed 50 = 0.45 m/s = 45 cm/s -> duration 1.0s = 45cm travel.
 - speed 20 = 0.18 m/s -> Precision maneuvering.
 - 90° turn at speed 50 ≈ 1.0 second.
+"""
 
-**Response Format (JSON):**
-{
-  "command": "MOVE_FORWARD",
-  "speed": 40,
-  "duration": 1.0,
-  "reasoning": "FRONT is 850mm (clear). LEFT is 400mm, RIGHT is 1200mm. Safe to proceed.",
-  "speak": "Path clear, moving forward."
-}
-
+PROMPT_SAFETY = """\
 **SAFETY PROTOCOLS:**
 1. **NEVER output STOP unless trapped on all 4 sides.** Always try to STRAFE or TURN around obstacles.
-2. **Trust LiDAR over RGB.** If camera shows clear but LiDAR < 300mm, DO NOT move that direction.
-3. **Micro-movements:** If FRONT < 400mm, use short durations (0.2-0.5s).
+2. **Trust LiDAR over RGB.** If camera shows clear but LiDAR is DANGER or TIGHT, DO NOT move that direction.
+3. **Micro-movements:** If FRONT is DANGER, TIGHT or CLOSE, use short durations (0.2-0.5s).
+"""
 
+PROMPT_COMMANDS = """\
 **Supported Commands:**
 - MOVE_FORWARD, MOVE_BACKWARD
 - MOVE_LEFT (strafe), MOVE_RIGHT (strafe)
@@ -76,88 +162,427 @@ LIDAR READINGS:
 - STOP
 """
 
-    def _format_lidar_text(self, lidar_data):
-        """Formats LiDAR sector data into readable text for the prompt."""
-        if not lidar_data:
-            return "LIDAR DATA: Unavailable."
-        
-        # Convert string keys to int (from JSON)
-        lidar_data = {int(k): v for k, v in lidar_data.items()}
+SYSTEM_INSTRUCTION = "\n".join([
+    PROMPT_ROLE,
+    PROMPT_LIDAR_FORMAT,
+    PROMPT_NAV_LOGIC,
+    PROMPT_ROBOT_SPECS,
+    PROMPT_SPEED_CAL,
+    PROMPT_SAFETY,
+    PROMPT_COMMANDS,
+])
+
+COMMANDS = [
+    "MOVE_FORWARD", "MOVE_BACKWARD",
+    "MOVE_LEFT", "MOVE_RIGHT",
+    "TURN_LEFT", "TURN_RIGHT",
+    "STOP",
+]
+
+NAV_COMMAND_PROPERTIES = {
+    "command": types.Schema(type=types.Type.STRING, enum=COMMANDS),
+    "speed": types.Schema(type=types.Type.INTEGER, minimum=0, maximum=100),
+    "duration": types.Schema(type=types.Type.NUMBER, description="Seconds to run the command."),
+    "reasoning": types.Schema(type=types.Type.STRING, description="Sector readings that drove the decision."),
+    "speak": types.Schema(type=types.Type.STRING, description="Short phrase to say aloud."),
+}
+
+
+def nav_command_schema(fields):
+    # Decoding is constrained server-side to this shape, so the prompt no longer has to
+    # describe the JSON format. command/speed/duration come first so they stream first.
+    return types.Schema(
+        type=types.Type.OBJECT,
+        properties={name: NAV_COMMAND_PROPERTIES[name] for name in fields},
+        required=list(fields),
+        property_ordering=list(fields),
+    )
+
+
+NAV_COMMAND_SCHEMA = nav_command_schema(["command", "speed", "duration", "reasoning", "speak"])
+# Low-latency mode: only the motor fields, so the decoder stops after a few dozen tokens.
+MINIMAL_NAV_COMMAND_SCHEMA = nav_command_schema(["command", "speed", "duration"])
+MINIMAL_MAX_OUTPUT_TOKENS = 64
+# Warm-up only opens the connection; no schema or system instruction, one output token.
+WARMUP_CONFIG = types.GenerateContentConfig(max_output_tokens=1)
+
+# Fixed text around the per-frame LiDAR readings; only the readings change between frames.
+PROMPT_HEADER_PART = types.Part.from_text(
+    text="Analyze this camera frame and the LiDAR data below. Provide a navigation command."
+)
+PROMPT_QUESTION_PART = types.Part.from_text(
+    text="Based on the image and LiDAR readings, what should the robot do next?"
+)
+
+MEMORY_SUMMARY_PROMPT = (
+    "Summarize these recent navigation decisions of a mobile robot into a few short "
+    "sentences: where it has been, what it saw and what blocked it. Plain text only.\n\n"
+)
+
+
+@functools.lru_cache(maxsize=256)
+def lidar_part(lidar_text):
+    # Banded readings repeat from frame to frame, so the Part is usually already built.
+    return types.Part.from_text(text=lidar_text)
+
+
+_client = None
+
+
+def get_client():
+    """Returns the process-wide genai.Client, creating it on first use."""
+    global _client
+    if _client is None:
+        api_key = os.environ.get("GEMINI_API_KEY")
+        if not api_key:
+            log.warning("GEMINI_API_KEY environment variable not set.")
+        _client = genai.Client(api_key=api_key)
+    return _client
+
+
+class GeminiService:
+    # Sectors (YDLidar X4: 0=Front, Clockwise)
+    # FRONT: 345-360 and 0-15
+    FRONT_ANGLES = np.r_[345:360, 0:16]
+    RIGHT_ANGLES = np.arange(75, 106)
+    BACK_ANGLES = np.arange(165, 196)
+    LEFT_ANGLES = np.arange(255, 286)
+
+    def __init__(self, minimal=False):
+        self.client = get_client()
+        self.model_name = "gemini-robotics-er-1.5-preview"
+
+        self.system_instruction = SYSTEM_INSTRUCTION
+        # minimal=True drops reasoning/speak and caps output tokens for the fastest decisions.
+        self.minimal = minimal
+        self.response_schema = MINIMAL_NAV_COMMAND_SCHEMA if minimal else NAV_COMMAND_SCHEMA
+        self.max_output_tokens = MINIMAL_MAX_OUTPUT_TOKENS if minimal else None
+
+        # Generation config, rebuilt only when the system instruction changes.
+        self._config = None
+
+        self.response_cache = ResponseCache(maxsize=128)
+        self.frames_seen = 0
+        self.reflex_hits = 0
+        # Requests in flight keyed by cache key, and a cap on concurrent Gemini calls.
+        self._inflight = {}
+        self._request_slots = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        self._background_tasks = set()
+
+        self.memory = MemoryService()
+
+        # Mission state appended to the system instruction; the response cache key
+        # carries a digest of it.
+        self.current_goal = None
+        self.long_term_context = None
+        self._context_sig = "nocontext"
+
+    def update_current_goal(self, goal):
+        if goal != self.current_goal:
+            self.current_goal = goal
+            self._rebuild_context()
+
+    def update_memory_context(self, context):
+        if context != self.long_term_context:
+            self.long_term_context = context
+            self._rebuild_context()
+
+    def _rebuild_context(self):
+        """Rebuilds the system instruction around the goal/memory."""
+        lines = []
+        if self.current_goal:
+            lines.append(f"**CURRENT GOAL:** {self.current_goal}")
+        if self.long_term_context:
+            lines.append(f"**MEMORY OF RECENT ACTIVITY:**\n{self.long_term_context}")
+        if lines:
+            text = "\n".join(lines)
+            self.system_instruction = "\n".join([SYSTEM_INSTRUCTION, text])
+            self._context_sig = hashlib.blake2b(text.encode(), digest_size=4).hexdigest()
+        else:
+            self.system_instruction = SYSTEM_INSTRUCTION
+            self._context_sig = "nocontext"
+        self._config = None
+
+    def _generation_config(self):
+        # Built once per system instruction rather than once per frame.
+        if self._config is None:
+            self._config = types.GenerateContentConfig(
+                system_instruction=self.system_instruction,
+                response_mime_type="application/json",
+                response_schema=self.response_schema,
+                max_output_tokens=self.max_output_tokens,
+            )
+        return self._config
+
+    async def summarize_memory(self, history):
+        """Condenses recent decision logs into a short memory for the system instruction."""
+        response = await self.client.aio.models.generate_content(
+            model=self.model_name,
+            contents=MEMORY_SUMMARY_PROMPT + history,
+        )
+        return (response.text or "").strip()
+
+    async def _generate(self, contents):
+        return await self.client.aio.models.generate_content_stream(
+            model=self.model_name,
+            contents=contents,
+            config=self._generation_config()
+        )
+
+    async def warmup(self):
+        """Tiny request that pays TLS/HTTP setup before the first real frame arrives."""
+        await self.client.aio.models.generate_content(
+            model=self.model_name,
+            contents=[types.Content(role="user", parts=[types.Part.from_text(text="ping")])],
+            config=WARMUP_CONFIG
+        )
+
+    async def _stream_text(self, contents):
+        """Yields response text chunks, retrying transient failures that happen before any output."""
+        start = time.monotonic()
+        delay = RETRY_INITIAL_DELAY
+        while True:
+            received = False
+            try:
+                async for chunk in await self._generate(contents):
+                    if chunk.text:
+                        received = True
+                        yield chunk.text
+                return
+            except errors.APIError as e:
+                if received:
+                    raise
+                if e.code not in RETRYABLE_CODES:
+                    raise
+                # Exponential backoff with full jitter, bounded by the per-frame deadline.
+                wait = random.uniform(0, delay)
+                if time.monotonic() - start + wait > RETRY_DEADLINE_SECONDS:
+                    raise
+                log.info("Gemini returned %s, retrying in %.0f ms", e.code, wait * 1000)
+                await asyncio.sleep(wait)
+                delay = min(delay * 2, RETRY_MAX_DELAY)
+
+    def _spawn(self, coro):
+        # Hold a reference so fire-and-forget tasks are not garbage collected mid-flight.
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    @staticmethod
+    def _early_decision(text):
+        """Extracts command/speed/duration from a partial JSON response once all three are complete."""
+        decision = {}
+        for field, pattern in EARLY_FIELD_PATTERNS.items():
+            match = pattern.search(text)
+            if not match:
+                return None
+            decision[field] = match.group(1)
+        return {
+            "command": decision["command"],
+            "speed": int(float(decision["speed"])),
+            "duration": float(decision["duration"]),
+        }
+
+    async def _finish_stream(self, stream, chunks, cache_key):
+        """Drains the rest of a streamed response and caches the complete decision."""
+        try:
+            async for text in stream:
+                chunks.append(text)
+            data = json_loads("".join(chunks))
+            log.info("Reasoning: %s", data.get("reasoning"))
+            if cache_key:
+                self.response_cache.put(cache_key, data)
+            self.memory.add_log(dict(data))
+        except Exception:
+            log.warning("Failed to finish streamed response", exc_info=True)
+
+    def _sector_mins(self, lidar_data):
+        """
+        Returns (min_dist, angle) for the FRONT, RIGHT, BACK and LEFT sectors.
+        lidar_data: 360-slot distance array (0 = no reading) or a JSON {angle: dist} map.
+        """
+        if isinstance(lidar_data, np.ndarray):
+            scan = np.where(lidar_data > 0, lidar_data, np.inf).astype(np.float32)
+        else:
+            # Scatter the JSON {angle: dist} map into a 360-slot array; missing angles stay inf.
+            scan = np.full(360, np.inf, dtype=np.float32)
+            angles = np.fromiter(map(int, lidar_data.keys()), dtype=np.int32, count=len(lidar_data))
+            scan[angles % 360] = np.fromiter(lidar_data.values(), dtype=np.float32, count=len(lidar_data))
         
-        def get_sector_min(angles_list):
-            """Get minimum distance and angle for a list of angles to check."""
-            min_dist = float('inf')
-            min_ang = None
-            for ang in angles_list:
-                if ang in lidar_data:
-                    d = lidar_data[ang]
-                    if d < min_dist:
-                        min_dist = d
-                        min_ang = ang
-            if min_dist == float('inf'):
+        def get_sector_min(sector):
+            """Get minimum distance and angle over the sector's angle indices."""
+            dists = scan[sector]
+            i = dists.argmin()
+            if not np.isfinite(dists[i]):
                 return None, None
-            return min_dist, min_ang
-        
-        # Define sectors (YDLidar X4: 0=Front, Clockwise)
-        # FRONT: 345-360 and 0-15
-        front_angles = list(range(345, 360)) + list(range(0, 16))
-        right_angles = list(range(75, 106))
-        back_angles = list(range(165, 196))
-        left_angles = list(range(255, 286))
+            return float(dists[i]), int(sector[i])
         
-        f_dist, f_ang = get_sector_min(front_angles)
-        r_dist, r_ang = get_sector_min(right_angles)
-        b_dist, b_ang = get_sector_min(back_angles)
-        l_dist, l_ang = get_sector_min(left_angles)
+        return (
+            get_sector_min(self.FRONT_ANGLES),
+            get_sector_min(self.RIGHT_ANGLES),
+            get_sector_min(self.BACK_ANGLES),
+            get_sector_min(self.LEFT_ANGLES),
+        )
+
+    def _format_lidar_text(self, sectors):
+        """Formats LiDAR sector data into readable text for the prompt."""
+        if not sectors:
+            return "LIDAR DATA: Unavailable."
         
         def fmt(d, a):
-            if d is None: return "CLEAR (>2000mm)"
-            if d > 2000: return "CLEAR (>2000mm)"
-            return f"{int(d)}mm (closest at {a}°)"
+            label = distance_label(d)
+            if label == "CLEAR": return label
+            return f"{label}@{a}°"
         
-        return f"""LIDAR READINGS:
-- FRONT (345°-15°): {fmt(f_dist, f_ang)}
-- RIGHT (75°-105°): {fmt(r_dist, r_ang)}
-- BACK (165°-195°): {fmt(b_dist, b_ang)}
-- LEFT (255°-285°): {fmt(l_dist, l_ang)}"""
+        return LIDAR_TEXT_TEMPLATE.format_map(
+            {name: fmt(d, a) for name, (d, a) in zip(("f", "r", "b", "l"), sectors)}
+        )
+
+    def _preprocess_image(self, image_bytes):
+        """Caps the frame to the model's native size and re-encodes oversized uploads."""
+        if len(image_bytes) <= REENCODE_THRESHOLD_BYTES:
+            return image_bytes
+        img = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            return image_bytes
+        h, w = img.shape[:2]
+        scale = MAX_IMAGE_SIDE / max(h, w)
+        if scale < 1.0:
+            img = cv2.resize(img, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+        ok, buffer = cv2.imencode('.jpg', img, [int(cv2.IMWRITE_JPEG_QUALITY), REENCODE_QUALITY])
+        if not ok or len(buffer) >= len(image_bytes):
+            return image_bytes
+        return buffer.tobytes()
+
+    def _reflex(self, sectors):
+        """Returns a local decision for trivially clear or fully blocked scans, else None."""
+        self.frames_seen += 1
+        if self.frames_seen % 100 == 0:
+            log.info("Reflex hit rate: %.1f%%", 100 * self.reflex_hits / self.frames_seen)
+        # The reflex knows nothing about the goal; with one set, every frame goes to the model.
+        if not sectors or self.current_goal:
+            return None
+        # An empty sector is not open space: the client drops returns under 150mm,
+        # so an obstacle against the robot looks exactly like no obstacle at all.
+        if any(d is None for d, _ in sectors):
+            return None
+        front, right, back, left = (d for d, _ in sectors)
+
+        if front > REFLEX_CLEAR_FRONT_MM and left > REFLEX_CLEAR_SIDE_MM and right > REFLEX_CLEAR_SIDE_MM:
+            self.reflex_hits += 1
+            return {
+                "command": "MOVE_FORWARD", "speed": 50, "duration": 0.5,
+                "reasoning": f"Reflex: FRONT {distance_label(sectors[0][0])}, sides clear.",
+                "reflex": True,
+            }
+        if front < REFLEX_BLOCKED_FRONT_MM and max(left, right, back) < REFLEX_BLOCKED_SIDE_MM:
+            self.reflex_hits += 1
+            return {
+                "command": "STOP", "speed": 0, "duration": 0,
+                "reasoning": "Reflex: trapped on all 4 sides.",
+                "reflex": True,
+            }
+        return None
+
+    def _cache_key(self, image_bytes, sectors):
+        """Cache key from the frame's perceptual hash, the sectors' distance bands and the goal/memory digest."""
+        frame_hash = dhash(image_bytes) if image_bytes else "noimg"
+        if frame_hash is None:
+            return None
+        lidar_sig = "-".join(distance_label(d) for d, _ in sectors) if sectors else "nolidar"
+        return f"{CACHE_VERSION}:{frame_hash}:{lidar_sig}:{self._context_sig}"
 
     async def analyze_frame(self, image_bytes, lidar_data=None):
+        loop = asyncio.get_running_loop()
         try:
-            # Format LiDAR data as text
-            lidar_text = self._format_lidar_text(lidar_data)
-            
-            prompt_text = f"""Analyze this camera frame and the LiDAR data below. Provide a navigation command.
+            sectors = self._sector_mins(lidar_data) if lidar_data is not None and len(lidar_data) else None
+        except Exception as e:
+            log.warning("Failed to prepare frame", exc_info=True)
+            return {"command": "STOP", "speed": 0, "reasoning": f"Error: {str(e)}"}
+
+        # Unambiguous LiDAR state: answer locally without an API round-trip or a frame decode.
+        reflex = self._reflex(sectors)
+        if reflex is not None:
+            return reflex
 
-{lidar_text}
+        try:
+            cache_key = await loop.run_in_executor(IMAGE_POOL, self._cache_key, image_bytes, sectors)
+        except Exception as e:
+            log.warning("Failed to prepare frame", exc_info=True)
+            return {"command": "STOP", "speed": 0, "reasoning": f"Error: {str(e)}"}
 
-Based on the image and LiDAR readings, what should the robot do next?"""
+        pending = None
+        if cache_key:
+            # Near-identical scene: reuse the previous decision instead of calling Gemini.
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                cached["cached"] = True
+                return cached
+
+            # Same scene already being analyzed by another caller: share that request.
+            if cache_key in self._inflight:
+                return dict(await asyncio.shield(self._inflight[cache_key]))
+            pending = asyncio.get_running_loop().create_future()
+            self._inflight[cache_key] = pending
+
+        data = {"command": "STOP", "speed": 0, "reasoning": "Request cancelled."}
+        try:
+            async with self._request_slots:
+                data = await self._analyze(image_bytes, sectors, cache_key)
+            return data
+        finally:
+            if pending is not None:
+                del self._inflight[cache_key]
+                pending.set_result(data)
+
+    async def _analyze(self, image_bytes, sectors, cache_key):
+        try:
+            # Format LiDAR data as text
+            lidar_text = self._format_lidar_text(sectors)
 
             parts = []
             if image_bytes:
-                parts.append(types.Part.from_bytes(data=image_bytes, mime_type="image/jpeg"))
-            parts.append(types.Part.from_text(text=prompt_text))
-
-            response = await self.client.aio.models.generate_content(
-                model=self.model_name,
-                contents=[
-                    types.Content(
-                        role="user",
-                        parts=parts
-                    )
-                ],
-                config=types.GenerateContentConfig(
-                    system_instruction=self.system_instruction,
-                    response_mime_type="application/json"
+                image_bytes = await asyncio.get_running_loop().run_in_executor(
+                    IMAGE_POOL, self._preprocess_image, image_bytes
                 )
-            )
+                parts.append(types.Part.from_bytes(data=image_bytes, mime_type=image_mime(image_bytes)))
+            parts.append(PROMPT_HEADER_PART)
+            parts.append(lidar_part(lidar_text))
+            parts.append(PROMPT_QUESTION_PART)
+
+            contents = [
+                types.Content(
+                    role="user",
+                    parts=parts
+                )
+            ]
 
-            if response.text:
-                data = json.loads(response.text)
+            stream = self._stream_text(contents)
+            chunks = []
+            async for text in stream:
+                chunks.append(text)
+                decision = self._early_decision("".join(chunks))
+                if decision:
+                    # Act as soon as the motor fields are complete; reasoning keeps streaming.
+                    if cache_key:
+                        self.response_cache.put(cache_key, decision)
+                    self._spawn(self._finish_stream(stream, chunks, cache_key))
+                    return decision
+
+            if chunks:
+                data = json_loads("".join(chunks))
+                if cache_key:
+                    self.response_cache.put(cache_key, data)
+                self.memory.add_log(dict(data))
                 return data
             else:
                 return {"command": "STOP", "speed": 0, "reasoning": "No response from model."}
 
+        except errors.APIError as e:
+            # Auth, quota exhausted past the retry deadline, invalid request: nothing to gain from a traceback.
+            log.warning("Gemini request failed (%s): %s", e.code, e.message)
+            return {"command": "STOP", "speed": 0, "reasoning": f"Error: {str(e)}"}
         except Exception as e:
-            print(f"Error calling Gemini: {e}")
+            log.warning("Gemini call failed", exc_info=True)
             return {"command": "STOP", "speed": 0, "reasoning": f"Error: {str(e)}"}
 
@@ -1,10 +1,39 @@
 import os
+import sys
+import json
+import time
 from dotenv import load_dotenv
 from google import genai
 
 load_dotenv()
 
-def list_models():
+# Model IDs change rarely; reuse the last listing for a day. Pass --refresh to force.
+MODELS_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models.json")
+MODELS_CACHE_TTL = 86400
+
+def print_models(models):
+    for model in models:
+        print(f"Model: {model['name']}")
+        print(f"  DisplayName: {model['display_name']}")
+        print("-" * 20)
+
+def load_cached_models():
+    try:
+        if time.time() - os.path.getmtime(MODELS_CACHE) < MODELS_CACHE_TTL:
+            with open(MODELS_CACHE) as f:
+                return json.load(f)
+    except (OSError, ValueError):
+        pass
+    return None
+
+def list_models(refresh=False):
+    if not refresh:
+        models = load_cached_models()
+        if models is not None:
+            print(f"Cached model list ({MODELS_CACHE}):")
+            print_models(models)
+            return
+
     api_key = os.environ.get("GEMINI_API_KEY")
     if not api_key:
         print("Error: GEMINI_API_KEY not found.")
@@ -15,12 +44,17 @@ def list_models():
     print("Listing available models...")
     try:
         # Synchronous list
-        for model in client.models.list(config={"page_size": 100}):
-            print(f"Model: {model.name}")
-            print(f"  DisplayName: {model.display_name}")
-            print("-" * 20)
+        models = [
+            {"name": model.name, "display_name": model.display_name}
+            for model in client.models.list(config={"page_size": 100})
+        ]
     except Exception as e:
         print(f"Error listing models: {e}")
+        return
+
+    print_models(models)
+    with open(MODELS_CACHE, "w") as f:
+        json.dump(models, f, indent=2)
 
 if __name__ == "__main__":
-    list_models()
+    list_models(refresh="--refresh" in sys.argv)
@@ -1,11 +1,74 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
+import os
 import asyncio
 import json
+try:
+    import orjson
+    json_loads = orjson.loads
+    json_dumps = lambda obj: orjson.dumps(obj).decode()
+except ImportError:
+    json_loads = json.loads
+    json_dumps = json.dumps
 import time
+import logging
+import logging.handlers
+import queue
+import numpy as np
 from gemini_service import GeminiService
 
+def setup_logging(maxsize=1000):
+    """
+    Routes logging through a bounded queue drained by a listener thread, so the
+    event loop only enqueues records. Records are dropped if the queue is full.
+    """
+    class DroppingQueueHandler(logging.handlers.QueueHandler):
+        def enqueue(self, record):
+            try:
+                self.queue.put_nowait(record)
+            except queue.Full:
+                pass
+
+    log_queue = queue.Queue(maxsize)
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.addHandler(DroppingQueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    listener.start()
+    return listener
+
+
+log_listener = setup_logging()
+
+# History shorter than this is kept verbatim instead of being summarized by Gemini.
+SUMMARIZE_MIN_CHARS = 800
+MEMORY_CONTEXT_MAX_CHARS = 1000
+
+
+def decode_frame(data):
+    """
+    Splits a binary frame from the client: 4-byte little-endian length of the
+    JSON header ({"scan": 360, "ts": ...}), the header, "scan" little-endian
+    uint16 LiDAR distances in mm indexed by degree (0 = no reading), then the
+    raw image (empty when there is no image). Returns (image, header, scan);
+    scan is None when the frame carries no readings.
+    """
+    n = int.from_bytes(data[:4], "little")
+    header = json_loads(data[4:4 + n]) if n else {}
+    offset = 4 + n
+    scan = None
+    count = header.get("scan", 0)
+    if count:
+        scan = np.frombuffer(data, dtype="<u2", count=count, offset=offset)
+        offset += 2 * count
+        if not scan.any():
+            scan = None
+    image_bytes = data[offset:] or None
+    return image_bytes, header, scan
+
 app = FastAPI()
 
 app.add_middleware(
@@ -16,7 +79,7 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-gemini_service = GeminiService()
+gemini_service = GeminiService(minimal=os.getenv("GEMINI_LOW_LATENCY") == "1")
 
 @app.get("/")
 async def root():
@@ -26,31 +89,52 @@ async def root():
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
     print("Client connected")
+    # Latest-frame-wins: a reader task keeps at most one pending message, so frames
+    # that arrive while Gemini is busy replace each other instead of queueing up.
+    frames = asyncio.Queue(maxsize=1)
+    dropped = 0
+
+    async def reader():
+        nonlocal dropped
+        try:
+            while True:
+                message = await websocket.receive_bytes()
+                if frames.full():
+                    frames.get_nowait()
+                    dropped += 1
+                frames.put_nowait(message)
+        finally:
+            # Wake the analyze loop; it re-raises whatever ended the reader.
+            if frames.full():
+                frames.get_nowait()
+            frames.put_nowait(None)
+
+    reader_task = asyncio.create_task(reader())
     try:
         while True:
-            # Receive JSON message containing image and lidar data
-            message = await websocket.receive_text()
-            payload = json.loads(message)
-            
-            # Extract components
-            import base64
-            image_b64 = payload.get("image", "")
-            lidar_data = payload.get("lidar", {})
-            
-            image_bytes = base64.b64decode(image_b64) if image_b64 else None
+            message = await frames.get()
+            if message is None:
+                reader_task.result()
+                break
+            # scan is None when the frame has no readings (LiDAR down or an all-zero
+            # scan); analyze_frame then reports the LiDAR as unavailable.
+            image_bytes, header, scan = decode_frame(message)
             
             # Record start time for latency check
             start_time = time.time()
             
             # Process with Gemini (pass both image and lidar)
-            command_data = await gemini_service.analyze_frame(image_bytes, lidar_data)
+            command_data = await gemini_service.analyze_frame(image_bytes, scan)
             
             # Calculate processing time
             process_time = time.time() - start_time
             command_data['latency'] = f"{process_time:.3f}s"
+            # Echo the client's send time so it can match the reply to its frame.
+            if "ts" in header:
+                command_data['ts'] = header["ts"]
             
             # Send command back to client
-            await websocket.send_json(command_data)
+            await websocket.send_text(json_dumps(command_data))
             
     except WebSocketDisconnect:
         print("Client disconnected")
@@ -60,11 +144,26 @@ async def websocket_endpoint(websocket: WebSocket):
             await websocket.close()
         except:
             pass
+    finally:
+        reader_task.cancel()
+        if dropped:
+            logging.getLogger("ws").info("Dropped %d stale frames this session.", dropped)
 
 
 @app.on_event("startup")
 async def startup_event():
+    try:
+        await asyncio.wait_for(gemini_service.warmup(), timeout=2.0)
+        logging.getLogger("gemini").info("Gemini client warmed up.")
+    except Exception as e:
+        logging.getLogger("gemini").warning("Gemini warm-up failed: %r", e)
     asyncio.create_task(memory_consolidation_loop())
+    asyncio.create_task(gemini_service.memory.flush_loop())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await gemini_service.memory.aclose()
+    log_listener.stop()
 
 async def memory_consolidation_loop():
     print("Memory consolidation daemon started.")
@@ -81,9 +180,14 @@ async def memory_consolidation_loop():
             print("Consolidating memory from Firebase...")
             history = await gemini_service.memory.fetch_history()
             if history:
-                # Summarize with Gemini
-                print("Summarizing recent events...")
-                summary = await gemini_service.summarize_memory(history)
+                if len(history) > SUMMARIZE_MIN_CHARS:
+                    # Summarize with Gemini
+                    print("Summarizing recent events...")
+                    summary = await gemini_service.summarize_memory(history)
+                else:
+                    # Too little to be worth an LLM round-trip: keep the raw lines.
+                    previous = gemini_service.long_term_context or ""
+                    summary = f"{previous}\n{history}".strip()[-MEMORY_CONTEXT_MAX_CHARS:]
                 
                 gemini_service.update_memory_context(summary)
                 await gemini_service.memory.clear_history()
@@ -94,4 +198,9 @@ async def memory_consolidation_loop():
             print(f"Memory consolidation failed: {e}")
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # loop/http "auto" pick uvloop and httptools when installed (uvicorn[standard]).
+    # Frames are JPEG; per-message deflate would only spend CPU on incompressible data.
+    uvicorn.run(
+        app, host="0.0.0.0", port=8000, loop="auto", http="auto",
+        ws_per_message_deflate=False, ws_max_size=2**23
+    )
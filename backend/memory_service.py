@@ -1,71 +1,131 @@
 import httpx
 import asyncio
 import json
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
 import time
+import uuid
+
+try:
+    import h2  # noqa: F401  (httpx only enables HTTP/2 when h2 is installed)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Log entries are buffered and written in one PATCH per batch instead of one POST per frame.
+LOG_BATCH_SIZE = 20
+LOG_FLUSH_INTERVAL = 2.0
+# Oldest entries are dropped past this if Firebase is unreachable for a while.
+LOG_BUFFER_LIMIT = 500
+# Consolidation reads only this many of the newest log entries.
+HISTORY_QUERY = {"orderBy": '"$key"', "limitToLast": 50}
 
 class MemoryService:
     def __init__(self):
         # Base URL for Firebase Realtime Database
         self.db_url = "https://myagv-57b9a-default-rtdb.asia-southeast1.firebasedatabase.app"
         self.logs_path = "/agv_logs.json"
-        
-    async def add_log(self, data: dict):
+        # One long-lived client so the per-frame log path reuses the TLS connection.
+        self._client = httpx.AsyncClient(
+            base_url=self.db_url,
+            http2=HTTP2_AVAILABLE,
+            timeout=5.0,
+            limits=httpx.Limits(max_keepalive_connections=16, max_connections=32),
+        )
+        self._log_buf = []
+        self._flush_event = asyncio.Event()
+        self.dropped_logs = 0
+
+    async def aclose(self):
+        await self.flush()
+        await self._client.aclose()
+
+    def add_log(self, data: dict):
+        """
+        Queues a log entry; flush_loop writes it with the rest of its batch.
+        """
+        # Add timestamp
+        data["timestamp"] = time.time()
+        self._log_buf.append(data)
+        if len(self._log_buf) > LOG_BUFFER_LIMIT:
+            # Backpressure: Firebase is behind, so shed the oldest entries.
+            self.dropped_logs += len(self._log_buf) - LOG_BUFFER_LIMIT
+            del self._log_buf[:-LOG_BUFFER_LIMIT]
+        if len(self._log_buf) >= LOG_BATCH_SIZE:
+            self._flush_event.set()
+
+    async def flush(self):
         """
-        Pushes a new log entry to the database.
+        Writes all buffered log entries in a single PATCH.
         """
-        async with httpx.AsyncClient() as client:
+        batch, self._log_buf = self._log_buf, []
+        if self.dropped_logs:
+            print(f"Dropped {self.dropped_logs} log entries while Firebase was unreachable")
+            self.dropped_logs = 0
+        if not batch:
+            return
+        # Time-prefixed keys keep entries in insertion order, like Firebase push IDs.
+        entries = {f"{time.time_ns()}{i:03d}-{uuid.uuid4().hex[:8]}": entry for i, entry in enumerate(batch)}
+        try:
+            await self._client.patch(self.logs_path, json=entries)
+        except Exception as e:
+            print(f"Failed to log to Firebase: {e}")
+
+    async def flush_loop(self):
+        """
+        Flushes every LOG_FLUSH_INTERVAL seconds, or sooner once a batch fills up.
+        """
+        while True:
             try:
-                # Add timestamp
-                data["timestamp"] = time.time()
-                await client.post(f"{self.db_url}{self.logs_path}", json=data)
-            except Exception as e:
-                print(f"Failed to log to Firebase: {e}")
+                await asyncio.wait_for(self._flush_event.wait(), timeout=LOG_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_event.clear()
+            await self.flush()
 
     async def fetch_history(self):
         """
-        Fetches all logs, summarizes them, and returns a text summary.
+        Fetches the most recent logs and returns their reasoning as text lines.
         """
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(f"{self.db_url}{self.logs_path}")
-                if response.status_code == 200 and response.content:
-                    data = response.json()
-                    if not data:
-                        return None
-                    
-                    # Convert dict of push_ids to list
-                    history_items = []
-                    for key, value in data.items():
-                        if isinstance(value, dict) and 'reasoning' in value:
-                             history_items.append(f"- {value.get('reasoning')}")
-                    
-                    return "\n".join(history_items)
-                return None
-            except Exception as e:
-                print(f"Failed to fetch history: {e}")
-                return None
+        try:
+            # Only the most recent entries; keys are time-ordered.
+            response = await self._client.get(self.logs_path, params=HISTORY_QUERY)
+            if response.status_code == 200 and response.content:
+                data = json_loads(response.content)
+                if not data:
+                    return None
+                
+                return "\n".join(
+                    f"- {value['reasoning']}"
+                    for value in data.values()
+                    if isinstance(value, dict) and 'reasoning' in value
+                )
+            return None
+        except Exception as e:
+            print(f"Failed to fetch history: {e}")
+            return None
 
     async def clear_history(self):
         """
         Clears the logs from the database.
         """
-        async with httpx.AsyncClient() as client:
-            try:
-                await client.delete(f"{self.db_url}{self.logs_path}")
-            except Exception as e:
-                print(f"Failed to clear history: {e}")
+        try:
+            await self._client.delete(self.logs_path)
+        except Exception as e:
+            print(f"Failed to clear history: {e}")
     async def fetch_goal(self):
         """
         Fetches the current high-level goal from the database.
         """
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(f"{self.db_url}/agv_goals.json")
-                if response.status_code == 200 and response.content:
-                    data = response.json()
-                    if data and isinstance(data, dict):
-                        return data.get("current_goal")
-                return None
-            except Exception as e:
-                print(f"Failed to fetch goal: {e}")
-                return None
+        try:
+            response = await self._client.get("/agv_goals.json")
+            if response.status_code == 200 and response.content:
+                data = json_loads(response.content)
+                if data and isinstance(data, dict):
+                    return data.get("current_goal")
+            return None
+        except Exception as e:
+            print(f"Failed to fetch goal: {e}")
+            return None
@@ -0,0 +1,47 @@
+import collections
+import cv2
+import numpy as np
+
+# Bump whenever the prompt or response format changes so stale decisions are not reused.
+CACHE_VERSION = "v6"
+
+
+def dhash(image_bytes, hash_size=8):
+    """
+    64-bit difference hash of an encoded frame.
+    Frames that differ only by sensor noise or small lighting changes share a hash.
+    """
+    # Decoding at 1/8 scale is much cheaper than a full decode and plenty for a 9x8 hash.
+    img = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_8)
+    if img is None:
+        return None
+    small = cv2.resize(img, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return np.packbits(bits).tobytes().hex()
+
+
+class ResponseCache:
+    """
+    Small in-process LRU of model decisions.
+    Values are copied on the way in and out so callers can annotate them freely.
+    """
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return dict(entry)
+
+    def put(self, key, value):
+        self._entries[key] = dict(value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
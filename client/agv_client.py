@@ -1,19 +1,33 @@
 import asyncio
-import websockets
 import cv2
 import numpy as np
 import json
+try:
+    import orjson
+    json_loads = orjson.loads
+    json_dumps_bytes = orjson.dumps
+except ImportError:
+    json_loads = json.loads
+    json_dumps_bytes = lambda obj: json.dumps(obj).encode()
+import struct
 import time
 import os
 import platform
-import math
 import threading
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from motor_controller import MotorController
-from lidar_driver import LidarDriver
+from lidar_driver import LidarDriver, SCAN_ANGLES
+from ws_transport import connect, ConnectionLost
+from image_encoder import get_encoder, fit_frame, AdaptiveQuality, MAX_SIDE
 
 load_dotenv()
 
+# Per-frame messages go through this logger at DEBUG so production runs skip them.
+log = logging.getLogger("agv")
+
 # Detect platform for camera backend selection
 IS_WINDOWS = platform.system() == "Windows"
 IS_LINUX = platform.system() == "Linux"
@@ -22,6 +36,27 @@ IS_LINUX = platform.system() == "Linux"
 BACKEND_URL = os.getenv("BACKEND_URL", "ws://localhost:8000/ws")
 LIDAR_PORT = os.getenv("LIDAR_PORT", "/dev/ttyTHS1" if IS_LINUX else "COM3")
 
+# Pipeline: frames are captured and encoded while earlier ones are still in flight.
+# The backend keeps at most one frame waiting behind the one it is analyzing, so
+# two in flight never get dropped there.
+MAX_IN_FLIGHT = int(os.getenv("MAX_IN_FLIGHT", "2"))
+CAPTURE_FPS = float(os.getenv("CAPTURE_FPS", "10"))
+RESPONSE_TIMEOUT = 5.0
+# Repeated warnings from the capture loop are logged at most this often (seconds).
+WARN_INTERVAL = 1.0
+# Reconnect backoff after the backend drops or refuses the connection (seconds).
+RECONNECT_MIN_DELAY = 1.0
+RECONNECT_MAX_DELAY = 30.0
+# JPEG quality drops while round trips take longer than this (seconds).
+TARGET_RTT = float(os.getenv("TARGET_RTT", "1.5"))
+encode_image = get_encoder(os.getenv("IMAGE_FORMAT", "jpeg").lower())
+# Longest image side sent to the backend; e.g. 320 downsamples 640x480 to 320x240
+# before encoding, which cuts encode time and upload size about 4x.
+IMAGE_MAX_SIDE = int(os.getenv("IMAGE_MAX_SIDE", str(MAX_SIDE)))
+
+# Both JPEG encoders release the GIL, so encoding here keeps the event loop responsive.
+ENCODE_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="encode")
+
 
 def parse_camera_id(cam_id_str):
     """Parse camera ID from string - could be int, device path, or URL."""
@@ -37,6 +72,15 @@ def parse_camera_id(cam_id_str):
 
 # RGB Camera
 CAMERA_ID = parse_camera_id(os.getenv("CAMERA_ID", "0"))
+# Pixel format requested from the camera; empty keeps the driver default.
+CAMERA_FOURCC = os.getenv("CAMERA_FOURCC", "MJPG")
+# Forward the camera's own MJPEG frames untouched instead of decoding and re-encoding them.
+# V4L2 only; the camera's JPEGs are larger than ours, so this trades uplink for client CPU.
+MJPEG_PASSTHROUGH = os.getenv("MJPEG_PASSTHROUGH") == "1"
+# picows when installed; WS_TRANSPORT=websockets forces the pure-Python client.
+USE_PICOWS = os.getenv("WS_TRANSPORT", "picows") != "websockets"
+# Local camera preview window; off by default since the robot usually runs headless.
+SHOW_PREVIEW = os.getenv("SHOW_PREVIEW", "0") == "1"
 
 
 def get_platform_backend():
@@ -51,11 +95,11 @@ def get_platform_backend():
 
 class BufferlessVideoCapture:
     """
-    A wrapper around cv2.VideoCapture that continuously reads frames in a
+    A wrapper around cv2.VideoCapture that continuously grabs frames in a
     background thread, ensuring only the latest frame is ever returned.
     This provides stable RGB streaming.
     """
-    def __init__(self, name, backend=None):
+    def __init__(self, name, backend=None, passthrough=False):
         if backend is not None:
             self.cap = cv2.VideoCapture(name, backend)
         elif isinstance(name, int):
@@ -68,79 +112,111 @@ class BufferlessVideoCapture:
         else:
             self.cap = cv2.VideoCapture(name)
         
+        # Ask for MJPEG before the resolution: V4L2 validates the size against the format,
+        # and compressed frames need far less USB bandwidth than raw YUYV.
+        if CAMERA_FOURCC:
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*CAMERA_FOURCC))
         self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
         self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        self.lock = threading.Lock()
+        if passthrough:
+            if int(self.cap.get(cv2.CAP_PROP_FOURCC)) == cv2.VideoWriter_fourcc(*"MJPG"):
+                # read() then yields the compressed buffer as a flat uint8 array.
+                self.cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+            else:
+                # Raw formats (e.g. YUYV) are not JPEG; keep decoding and re-encode instead.
+                print("Camera is not delivering MJPG; passthrough disabled, re-encoding frames.")
+        # Keep the driver queue to one frame so read() never hands back a stale one.
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
         self.latest_frame = None
-        self.running = True
+        self.stopped = threading.Event()
+        # read() sets wanted; the reader decodes the next grabbed frame and sets ready.
+        self.wanted = threading.Event()
+        self.ready = threading.Event()
         self.thread = threading.Thread(target=self._reader, daemon=True)
         self.thread.start()
 
     def _reader(self):
-        while self.running:
-            ret, frame = self.cap.read()
-            if ret:
-                with self.lock:
+        # cap.grab() blocks until the next frame, so this runs at camera FPS and keeps
+        # the driver queue drained. Only frames someone asked for are decoded.
+        while not self.stopped.is_set():
+            if not self.cap.grab():
+                self.stopped.wait(0.01)
+                continue
+            if self.wanted.is_set():
+                self.wanted.clear()
+                ret, frame = self.cap.retrieve()
+                if ret:
+                    # retrieve() allocates a fresh array each time, so the reference
+                    # handed out stays valid without a lock or copy.
                     self.latest_frame = frame
-            time.sleep(0.01)
+                self.ready.set()
 
-    def read(self):
-        with self.lock:
-            if self.latest_frame is not None:
-                return True, self.latest_frame.copy()
-            return False, None
+    def read(self, timeout=0.5):
+        """
+        Returns the next frame from the camera, blocking up to about one frame
+        interval for it. Callers must not modify it in place.
+        """
+        self.ready.clear()
+        self.wanted.set()
+        if self.ready.wait(timeout) and self.latest_frame is not None:
+            return True, self.latest_frame
+        return False, None
 
     def isOpened(self):
         return self.cap.isOpened()
 
     def release(self):
-        self.running = False
+        self.stopped.set()
         self.thread.join(timeout=1.0)
         self.cap.release()
 
 
-def process_lidar_data(scan):
+# Dead Zones: Angle ranges where robot body is visible.
+# These need to be calibrated per-robot.
+# Format: list of (start_angle, end_angle) where start < end handles normal,
+# for wrap-around (e.g. 350-10), use two entries or special logic.
+# TODO: Calibrate these for MyAGV 2023 JN after running debug tool.
+DEAD_ZONES = [
+    # Example: If angles 355-5 always show ~19cm, exclude that sector.
+    # (355, 360), (0, 5) 
+]
+
+# Minimum valid distance (mm). Points closer than this are likely noise or self-reflection.
+MIN_VALID_DIST = 150  # 15cm
+MAX_VALID_DIST = 8000
+
+# Front sector for the emergency stop: 330 deg to 30 deg.
+FRONT_MASK = (SCAN_ANGLES < 30) | (SCAN_ANGLES > 330)
+
+
+# Bins outside every dead zone; fixed at startup.
+OUTSIDE_DEAD_ZONES = np.ones(360, dtype=bool)
+for _start, _end in DEAD_ZONES:
+    OUTSIDE_DEAD_ZONES &= (SCAN_ANGLES < _start) | (SCAN_ANGLES > _end)
+
+
+def process_lidar_data(dists, out=None):
     """
-    Filter and clean LiDAR data.
-    1. Remove invalid ranges (< 10cm or > 8m)
+    Filter and clean LiDAR data (360-slot distance array, 0 = no reading).
+    1. Remove invalid ranges (< 15cm or > 8m)
     2. Filter self-occlusion dead zones (robot body reflection).
+    Pass out (may be dists itself) to write the result into an existing array.
     """
-    # Dead Zones: Angle ranges where robot body is visible.
-    # These need to be calibrated per-robot.
-    # Format: list of (start_angle, end_angle) where start < end handles normal,
-    # for wrap-around (e.g. 350-10), use two entries or special logic.
-    # TODO: Calibrate these for MyAGV 2023 JN after running debug tool.
-    DEAD_ZONES = [
-        # Example: If angles 355-5 always show ~19cm, exclude that sector.
-        # (355, 360), (0, 5) 
-    ]
-    
-    # Minimum valid distance (mm). Points closer than this are likely noise or self-reflection.
-    MIN_VALID_DIST = 150  # 15cm
-    
-    clean_scan = {}
-    for angle, dist in scan.items():
-        # Range check
-        if dist < MIN_VALID_DIST or dist > 8000:
-             continue
-             
-        # Dead Zone check
-        in_dead_zone = False
-        for start, end in DEAD_ZONES:
-            if start <= angle <= end:
-                in_dead_zone = True
-                break
-        
-        if not in_dead_zone:
-             clean_scan[angle] = dist
-             
-    return clean_scan
+    valid = (dists >= MIN_VALID_DIST) & (dists <= MAX_VALID_DIST) & OUTSIDE_DEAD_ZONES
+    return np.multiply(dists, valid, out=out)
 
-def draw_lidar_view(scan, size=(480, 480), max_dist_mm=4000):
-    """
-    Draws a 2D radar view of the lidar scan.
-    scan: dict {angle_deg: dist_mm}
-    """
+# Point colors by distance (BGR): Red < 20cm, Yellow < 60cm, Green beyond.
+LIDAR_COLOR_EDGES = [200, 600]
+LIDAR_PALETTE = np.array([(0, 0, 255), (0, 255, 255), (0, 255, 0)], dtype=np.uint8)
+# Unit vectors per whole-degree bin. YDLidar X4: 0 deg = Front, clockwise,
+# so 0 deg points UP (-y) and 90 deg points RIGHT (+x) on screen.
+SCAN_SIN = np.sin(np.deg2rad(SCAN_ANGLES))
+SCAN_COS = np.cos(np.deg2rad(SCAN_ANGLES))
+
+
+@functools.lru_cache(maxsize=4)
+def _lidar_background(size, max_dist_mm):
+    """Rings, axes and robot marker; drawn once per (size, range) and reused."""
     # Create black background
     img = np.zeros((size[1], size[0], 3), dtype=np.uint8)
     cx, cy = size[0] // 2, size[1] // 2
@@ -159,69 +235,90 @@ def draw_lidar_view(scan, size=(480, 480), max_dist_mm=4000):
     # Draw Robot (Triangle pointing UP)
     pts = np.array([[cx, cy-15], [cx-10, cy+10], [cx+10, cy+10]], np.int32)
     cv2.fillPoly(img, [pts], (0, 0, 255))
+    img.flags.writeable = False
+    return img
+
+
+@functools.lru_cache(maxsize=4)
+def _lidar_no_data(size, max_dist_mm):
+    """Background with the NO LIDAR DATA label, rasterized once."""
+    img = _lidar_background(size, max_dist_mm).copy()
+    cv2.putText(img, "NO LIDAR DATA", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+    img.flags.writeable = False
+    return img
+
+
+def draw_lidar_view(dists, size=(480, 480), max_dist_mm=4000):
+    """
+    Draws a 2D radar view of the lidar scan.
+    dists: 360-slot distance array (mm, 0 = no reading)
+    """
+    img = _lidar_background(tuple(size), max_dist_mm).copy()
+    cx, cy = size[0] // 2, size[1] // 2
+    scale = min(cx, cy) / max_dist_mm # px per mm
     
     # Draw Points
-    if not scan:
-        cv2.putText(img, "NO LIDAR DATA", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-        return img
-        
-    for angle, dist in scan.items():
-        # YDLidar X4 Coordinate System:
-        # 0 deg = Front (Cable/Motor side)
-        # Direction: Clockwise
-        
-        # Math for Screen (0,0 is Top Left):
-        # We want 0 deg -> UP (Negative Y)
-        # We want 90 deg -> RIGHT (Positive X)
-        
-        # Formula:
-        # x = cx + dist * sin(rad)
-        # y = cy - dist * cos(rad)
-        
-        rad = math.radians(angle)
-        
-        px = cx + int(dist * scale * math.sin(rad))
-        py = cy - int(dist * scale * math.cos(rad))
-        
-        # Color based on distance (Red=Close, Yellow=Medium, Green=Far)
-        if dist < 200: # Very Close (<20cm)
-            color = (0, 0, 255) # Red
-        elif dist < 600: # Close (<60cm)
-            color = (0, 255, 255) # Yellow
-        else:
-            color = (0, 255, 0) # Green
-            
-        cv2.circle(img, (px, py), 2, color, -1)
+    valid = dists > 0
+    if not valid.any():
+        return _lidar_no_data(tuple(size), max_dist_mm).copy()
+    
+    d = dists[valid]
+    px = (cx + d * scale * SCAN_SIN[valid]).astype(np.int32)
+    py = (cy - d * scale * SCAN_COS[valid]).astype(np.int32)
+    colors = LIDAR_PALETTE[np.digitize(d, LIDAR_COLOR_EDGES)]
+    
+    # 3x3 dots, written with fancy indexing instead of one cv2.circle per point.
+    h, w = img.shape[:2]
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            x, y = px + dx, py + dy
+            inside = (x >= 0) & (x < w) & (y >= 0) & (y < h)
+            img[y[inside], x[inside]] = colors[inside]
         
     return img
 
 
-def check_safety(scan, safety_dist=150):
+def check_safety(dists, safety_dist=150):
     """
     Returns True if safe, False if obstacle detected in front.
     Front sector: 330 deg to 30 deg.
     Emergency Stop Distance: 15cm (150mm)
     """
-    if not scan: return True
-    
-    min_front_dist = float('inf')
-    
-    # Check angles -30 to +30 (handled as 330-360 and 0-30)
-    for ang, dist in scan.items():
-        if dist <= 0: continue
-        if ang < 30 or ang > 330:
-            if dist < min_front_dist:
-                min_front_dist = dist
+    front = dists[FRONT_MASK]
+    min_front_dist = np.min(front, where=front > 0, initial=np.inf)
                 
     if min_front_dist < safety_dist:
-        print(f"[Safety] Obstacle detected at {min_front_dist:.1f}mm!")
+        log.warning("[Safety] Obstacle detected at %.1fmm!", min_front_dist)
         return False
         
     return True
 
 
+def build_payload(frame, dists, quality):
+    """
+    Encodes the RGB frame and LiDAR scan into one binary websocket message:
+    4-byte little-endian length of the JSON header (scan length and send time,
+    echoed back with the command), the scan as 360 little-endian uint16
+    distances in mm (0 = no reading), then the raw image
+    (JPEG, or WebP with IMAGE_FORMAT=webp).
+    """
+    if frame.ndim < 3:
+        # MJPEG_PASSTHROUGH: already a JPEG straight from the camera.
+        image = frame
+    else:
+        image = encode_image(fit_frame(frame, IMAGE_MAX_SIDE), quality)
+    
+    scan = dists.astype("<u2")
+    header = json_dumps_bytes({"scan": len(scan), "ts": time.monotonic_ns()})
+    
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("[State]: Sending RGB (%d KB) + LiDAR (%d pts)...", memoryview(image).nbytes // 1024, np.count_nonzero(scan))
+    # Encoders may hand back a numpy buffer; join copies each part exactly once.
+    return b"".join((struct.pack('<I', len(header)), header, scan, image))
+
+
 async def run_agv_client():
-    motor = MotorController()
+    motor = MotorController(verbose=log.isEnabledFor(logging.DEBUG))
     
     # Init Lidar
     print(f"Initializing LiDAR on {LIDAR_PORT}...")
@@ -229,8 +326,8 @@ async def run_agv_client():
     lidar.start()
     
     print(f"Initializing RGB Camera: {CAMERA_ID}")
-    cap = BufferlessVideoCapture(CAMERA_ID)
-    time.sleep(1.0) # Allow camera to warm up
+    cap = BufferlessVideoCapture(CAMERA_ID, passthrough=MJPEG_PASSTHROUGH)
+    await asyncio.sleep(1.0) # Allow camera to warm up
     
     if not cap.isOpened():
         print("Error: Could not open RGB camera.")
@@ -239,84 +336,172 @@ async def run_agv_client():
 
     print(f"Connecting to {BACKEND_URL}...")
     
-    async with websockets.connect(BACKEND_URL) as websocket:
-        print("Connected to Backend.")
-        
-        try:
-            while True:
-                # print("\n[State]: Getting frame...")
-                
-                # Get RGB frame
-                ret, frame = cap.read()
-                if not ret or frame is None:
-                    print("Failed to grab frame")
-                    await asyncio.sleep(0.1)
-                    continue
-                
-                # Get LiDAR Scan
-                scan = lidar.get_latest_scan()
-                scan = process_lidar_data(scan)
-                
-                # Safety Check
-                is_safe = check_safety(scan)
-                
-                # --- VISUAL DEBUG WINDOW (RGB only now) ---
+    loop = asyncio.get_running_loop()
+    # Newest encoded frame waiting to be sent; older ones are replaced.
+    outbox = asyncio.Queue(maxsize=1)
+    in_flight = 0
+    quality = AdaptiveQuality(TARGET_RTT)
+    slot_free = asyncio.Event()
+    # Action currently executing in a worker thread. While it runs, the next
+    # frame is captured and analyzed, so inference overlaps with motion.
+    motor_task = None
+    # Scan buffers reused every frame: one for capture, one for the safety re-check.
+    scan_buf = np.zeros(360, dtype=np.float32)
+    safety_buf = np.zeros(360, dtype=np.float32)
+
+    async def capture():
+        """Stage 1: grab, show and encode frames at CAPTURE_FPS."""
+        last_grab_warning = None
+        while True:
+            started = loop.time()
+            # Get RGB frame (blocks until the camera delivers the next one)
+            ret, frame = await loop.run_in_executor(ENCODE_POOL, cap.read)
+            if not ret or frame is None:
+                if last_grab_warning is None or started - last_grab_warning >= WARN_INTERVAL:
+                    log.warning("Failed to grab frame")
+                    last_grab_warning = started
+                await asyncio.sleep(0.1)
+                continue
+            
+            # Get LiDAR Scan
+            # build_payload is awaited below, so the buffer is free again next frame.
+            _, scan = lidar.get_latest_scan_arrays(out=scan_buf)
+            process_lidar_data(scan, out=scan)
+            
+            # --- VISUAL DEBUG WINDOW (RGB only now) ---
+            if SHOW_PREVIEW:
                 try:
-                    cv2.imshow("MyAGV Camera View", frame)
+                    preview = frame if frame.ndim == 3 else cv2.imdecode(frame, cv2.IMREAD_COLOR)
+                    cv2.imshow("MyAGV Camera View", preview)
                     cv2.waitKey(1)
                 except Exception:
                     pass
-                # ---------------------------
+            # ---------------------------
 
-                # Encode RGB image to JPEG then base64
-                _, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), 60])
-                import base64
-                image_b64 = base64.b64encode(buffer.tobytes()).decode('utf-8')
-                
-                # Convert scan dict keys to strings for JSON
-                lidar_json = {str(k): v for k, v in scan.items()}
-                
-                # Create payload
-                payload = {
-                    "image": image_b64,
-                    "lidar": lidar_json
-                }
-                
-                print(f"[State]: Sending RGB ({len(image_b64)//1024} KB) + LiDAR ({len(lidar_json)} pts)...")
-                await websocket.send(json.dumps(payload))
+            payload = await loop.run_in_executor(ENCODE_POOL, build_payload, frame, scan, quality.quality)
+            if outbox.full():
+                outbox.get_nowait()
+            outbox.put_nowait(payload)
+            await asyncio.sleep(max(0.0, 1.0 / CAPTURE_FPS - (loop.time() - started)))
 
-                # Receive command
-                try:
-                    response = await asyncio.wait_for(websocket.recv(), timeout=5.0)
-                    command_data = json.loads(response)
-                    
-                    cmd = command_data.get("command")
-                    
-                    # Intercept forward movements if unsafe
-                    if not is_safe and cmd in ["MOVE_FORWARD"]:
-                        print("[Safety] Blocking forward movement due to obstacle.")
-                        command_data["command"] = "STOP"
-                        
-                    print(f"Received: {command_data}")
-                    motor.execute_command(command_data)
-                    
-                except asyncio.TimeoutError:
-                    print("Timeout waiting for backend response")
-                    motor.stop()
+    async def sender(websocket):
+        """Stage 2: send the newest frame whenever fewer than MAX_IN_FLIGHT are outstanding."""
+        nonlocal in_flight
+        while True:
+            while in_flight >= MAX_IN_FLIGHT:
+                slot_free.clear()
+                await slot_free.wait()
+            payload = await outbox.get()
+            in_flight += 1
+            await websocket.send(payload)
+
+    async def finish_motor_task():
+        """Cuts a running timed move short and waits for its executor job to end."""
+        nonlocal motor_task
+        if motor_task is None:
+            return
+        # An executor job cannot be cancelled; cut its wait short and let it
+        # finish so it cannot restart the motors after a later stop.
+        motor.interrupt()
+        try:
+            await motor_task
+        except Exception:
+            log.warning("Motor command failed", exc_info=True)
+        motor_task = None
+
+    async def receiver(websocket):
+        """Stage 3: receive commands and execute them, re-checking safety first."""
+        nonlocal in_flight, motor_task
+        while True:
+            try:
+                response = await asyncio.wait_for(websocket.recv(), timeout=RESPONSE_TIMEOUT)
+            except asyncio.TimeoutError:
+                log.warning("Timeout waiting for backend response")
+                # Treat outstanding frames as lost so the sender does not stall.
+                in_flight = 0
+                quality.update(RESPONSE_TIMEOUT)
+                slot_free.set()
+                await finish_motor_task()
+                await loop.run_in_executor(None, motor.stop)
+                continue
+            in_flight = max(0, in_flight - 1)
+            slot_free.set()
+
+            command_data = json_loads(response)
+            if "ts" in command_data:
+                quality.update((time.monotonic_ns() - command_data.pop("ts")) / 1e9)
+            cmd = command_data.get("command")
+            log.debug("Received: %s", command_data)
+            # The newer decision replaces whatever timed move is still running.
+            await finish_motor_task()
+            
+            # The scan sent with the frame is stale by now; check a fresh one.
+            _, fresh = lidar.get_latest_scan_arrays(out=safety_buf)
+            is_safe = check_safety(process_lidar_data(fresh, out=fresh))
+            
+            # Intercept forward movements if unsafe
+            if not is_safe and cmd in ["MOVE_FORWARD"]:
+                log.warning("[Safety] Blocking forward movement due to obstacle.")
+                command_data["command"] = "STOP"
                 
-        except websockets.exceptions.ConnectionClosed:
-            print("Connection closed by server")
-        except KeyboardInterrupt:
-            print("Client stopped by user")
+            motor.resume()
+            motor_task = loop.run_in_executor(None, motor.execute_command, command_data)
+
+    async def session(websocket):
+        """Runs the pipeline on one connection until it drops."""
+        nonlocal in_flight, motor_task
+        in_flight = 0
+        while not outbox.empty():
+            outbox.get_nowait()
+        stages = [
+            asyncio.create_task(capture()),
+            asyncio.create_task(sender(websocket)),
+            asyncio.create_task(receiver(websocket)),
+        ]
+        try:
+            await asyncio.gather(*stages)
         finally:
-            motor.stop()
-            cap.release()
-            lidar.stop()
-            cv2.destroyAllWindows()
+            for stage in stages:
+                stage.cancel()
+            await finish_motor_task()
+            await loop.run_in_executor(None, motor.stop)
 
+    # Motors, camera and LiDAR stay open across reconnects; only the socket is redone.
+    backoff = RECONNECT_MIN_DELAY
+    try:
+        while True:
+            try:
+                async with connect(BACKEND_URL, use_picows=USE_PICOWS) as websocket:
+                    print("Connected to Backend.")
+                    backoff = RECONNECT_MIN_DELAY
+                    await session(websocket)
+            except (ConnectionLost, OSError) as e:
+                print(f"Backend connection failed or closed ({e!r}), retrying in {backoff:.0f}s...")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, RECONNECT_MAX_DELAY)
+    except KeyboardInterrupt:
+        print("Client stopped by user")
+    finally:
+        # Thread joins and serial writes; keep them off the event loop.
+        await loop.run_in_executor(None, motor.stop)
+        await loop.run_in_executor(None, cap.release)
+        await loop.run_in_executor(None, lidar.stop)
+        if SHOW_PREVIEW:
+            cv2.destroyAllWindows()
 
 if __name__ == "__main__":
+    # LOG_LEVEL=DEBUG shows every frame sent and command received.
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO").upper(),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+    # libuv-based event loop when available (not on Windows); same API as asyncio.
+    try:
+        import uvloop
+        run = uvloop.run
+    except ImportError:
+        run = asyncio.run
     try:
-        asyncio.run(run_agv_client())
+        run(run_agv_client())
     except KeyboardInterrupt:
         pass
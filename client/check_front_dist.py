@@ -1,40 +1,49 @@
 import time
 import os
 import platform
-import math
-from lidar_driver import LidarDriver
+import functools
+import numpy as np
+from lidar_driver import LidarDriver, SCAN_ANGLES
 
 # Configuration
 IS_LINUX = platform.system() == "Linux"
 LIDAR_PORT = os.getenv("LIDAR_PORT", "/dev/ttyTHS1" if IS_LINUX else "COM3")
 
-def get_sector_info(scan, center_angle, width=20):
-    """Returns (min_dist, angle_of_min_dist) for a sector"""
-    if not scan: return None, None
-    
+@functools.lru_cache(maxsize=None)
+def sector_mask(center_angle, width):
+    """Boolean mask over the 360 scan bins for a sector; built once per sector."""
     half = width / 2.0
-    min_d = float('inf')
-    min_a = None
-    
     start_a = (center_angle - half) % 360
     end_a = (center_angle + half) % 360
     
-    for angle, dist in scan.items():
-        if dist <= 10: continue
-        
-        # Check angle inclusion handling wrap-around
-        if start_a < end_a:
-            in_sector = start_a <= angle <= end_a
-        else:
-             in_sector = angle >= start_a or angle <= end_a
-             
-        if in_sector:
-            if dist < min_d:
-                min_d = dist
-                min_a = angle
-                
-    if min_d == float('inf'): return None, None
-    return min_d, min_a
+    # Check angle inclusion handling wrap-around
+    if start_a < end_a:
+        mask = (SCAN_ANGLES >= start_a) & (SCAN_ANGLES <= end_a)
+    else:
+        mask = (SCAN_ANGLES >= start_a) | (SCAN_ANGLES <= end_a)
+    mask.flags.writeable = False
+    return mask
+
+def get_sector_info(dists, center_angle, width=20):
+    """
+    Returns (min_dist, angle_of_min_dist) for a sector.
+    dists: 360-slot distance array (mm, 0 = no reading)
+    """
+    candidates = np.where(sector_mask(center_angle, width) & (dists > 10), dists, np.inf)
+    min_a = int(np.argmin(candidates))
+    if candidates[min_a] == np.inf: return None, None
+    return float(candidates[min_a]), min_a
+
+# (center, width) of the sectors shown by main(): front, right, back, left.
+SECTORS = ((0, 30), (90, 30), (180, 30), (270, 30))
+SECTOR_MASKS = np.stack([sector_mask(c, w) for c, w in SECTORS])
+
+def get_sectors_info(dists):
+    """Returns [(min_dist, angle_of_min_dist), ...] for every entry in SECTORS in one pass."""
+    candidates = np.where(SECTOR_MASKS & (dists > 10), dists, np.inf)
+    min_a = np.argmin(candidates, axis=1)
+    min_d = candidates[np.arange(len(SECTORS)), min_a]
+    return [(float(d), int(a)) if d != np.inf else (None, None) for d, a in zip(min_d, min_a)]
 
 def main():
     print(f"Initializing LiDAR on {LIDAR_PORT}...")
@@ -45,13 +54,10 @@ def main():
     
     try:
         while True:
-            scan = lidar.get_latest_scan()
+            _, scan = lidar.get_latest_scan_arrays()
             
-            # Check 4 directions
-            f_dist, f_ang = get_sector_info(scan, 0, 30)
-            l_dist, l_ang = get_sector_info(scan, 270, 30) # 270 is Left in X4 (Clockwise)? No, 0=Front, 90=Right, 180=Back, 270=Left
-            r_dist, r_ang = get_sector_info(scan, 90, 30)
-            b_dist, b_ang = get_sector_info(scan, 180, 30)
+            # Check 4 directions: 0=Front, 90=Right, 180=Back, 270=Left (X4 is clockwise)
+            (f_dist, f_ang), (r_dist, r_ang), (b_dist, b_ang), (l_dist, l_ang) = get_sectors_info(scan)
             
             print("\033[2J\033[H", end="") # Clear Screen
             print("--- LiDAR Sector Analysis ---")
@@ -2,6 +2,10 @@ import serial
 import time
 import struct
 import math
+import numpy as np
+
+# CT, LS, FSA, LSA, CS following the AA 55 header.
+PACKET_INFO = struct.Struct('<BBHHH')
 
 class CustomYDLidarDriver:
     def __init__(self, port, baudrate=115200):
@@ -9,6 +13,8 @@ class CustomYDLidarDriver:
         self.baudrate = baudrate
         self.ser = None
         self.scanning = False
+        # Bytes read from the port but not yet parsed.
+        self._buf = bytearray()
 
     def connect(self):
         try:
@@ -29,6 +35,7 @@ class CustomYDLidarDriver:
         print("Sent Start Scan command")
         time.sleep(0.5)
         self.ser.reset_input_buffer()
+        self._buf.clear()
         self.scanning = True
 
     def stop_scan(self):
@@ -46,50 +53,31 @@ class CustomYDLidarDriver:
     def read_scan(self):
         if not self.ser or not self.scanning: return None
         
-        # We need to find the header AA 55
-        # Read byte by byte until we find it
-        
-        # Look for AA 55
-        # Since we are reading potentially misaligned stream
-        header = b''
-        while len(header) < 2:
-            b = self.ser.read(1)
-            if not b: return None # Timeout
-            
-            if len(header) == 0:
-                if b == b'\xaa':
-                    header += b
-            elif len(header) == 1:
-                if b == b'\x55':
-                    header += b
-                else:
-                     # Reset if not 55
-                     if b == b'\xaa':
-                         # We found another AA, maybe that's the start
-                         header = b'\xaa'
-                     else:
-                         header = b''
-        
-        # Found Header AA 55
-        # Read CT (1) and LS (1)
-        info = self.ser.read(2)
-        if len(info) < 2: return None
-        
-        ct = info[0]
-        ls = info[1] # Sample count
-        
-        # Read FSA (2), LSA (2), CS (2)
-        headers = self.ser.read(6)
-        if len(headers) < 6: return None
+        # Packets are parsed from an in-memory buffer; the port is read in
+        # whatever-is-waiting chunks instead of one byte at a time.
+        buf = self._buf
+        while True:
+            # Look for AA 55
+            # Since we are reading potentially misaligned stream
+            start = buf.find(b'\xaa\x55')
+            if start < 0:
+                # Keep a trailing AA, it may be the first half of the header
+                del buf[:-1]
+            else:
+                del buf[:start]
+                # Found Header AA 55
+                # CT (1) and LS (1), then FSA (2), LSA (2), CS (2), then LS * 2 bytes of data
+                if len(buf) >= 10 and len(buf) >= 10 + buf[3] * 2:
+                    break
+            chunk = self.ser.read(max(1, self.ser.in_waiting))
+            if not chunk: return None # Timeout
+            buf += chunk
         
-        fsa = struct.unpack('<H', headers[0:2])[0]
-        lsa = struct.unpack('<H', headers[2:4])[0]
-        cs  = struct.unpack('<H', headers[4:6])[0]
+        ct, ls, fsa, lsa, cs = PACKET_INFO.unpack_from(buf, 2) # ls: sample count
         
-        # Read Data: LS * 2 bytes
         data_len = ls * 2
-        raw_data = self.ser.read(data_len)
-        if len(raw_data) < data_len: return None
+        raw_data = bytes(buf[10:10 + data_len])
+        del buf[:10 + data_len]
         
         # Calculate Angles
         # FSA and LSA are shifted by 1 bit, then / 64
@@ -100,32 +88,23 @@ class CustomYDLidarDriver:
         if diff_angle < 0:
             diff_angle += 360
             
-        points = []
+        # Each point is 2 bytes, little endian
+        # Bit 0 and 1 might be quality or flags?
+        # Standard X4: 
+        #   <distance_low> <distance_high>
+        #   Distance = value / 4.0
+        distance = np.frombuffer(raw_data, dtype='<u2') * 0.25
         
-        for i in range(ls):
-            # Each point is 2 bytes
-            idx = i * 2
-            # Dist is 2 bytes, little endian
-            # Bit 0 and 1 might be quality or flags?
-            # Standard X4: 
-            #   <distance_low> <distance_high>
-            #   Distance = value / 4.0
-            
-            val = struct.unpack('<H', raw_data[idx:idx+2])[0]
-            distance = val / 4.0
-            
-            # Angle interpolation
-            # ang = (diff_angle / (ls - 1)) * i + angle_fsa + correction
-            # ignoring correction for simplicity first
-            if ls > 1:
-                angle = angle_fsa + (diff_angle / (ls - 1)) * i
-            else:
-                angle = angle_fsa
-                
-            if distance > 0:
-                points.append((angle, distance))
-                
-        return points
+        # Angle interpolation
+        # ang = (diff_angle / (ls - 1)) * i + angle_fsa + correction
+        # ignoring correction for simplicity first
+        if ls > 1:
+            angle = angle_fsa + (diff_angle / (ls - 1)) * np.arange(ls)
+        else:
+            angle = np.full(ls, angle_fsa)
+        
+        valid = distance > 0
+        return list(zip(angle[valid].tolist(), distance[valid].tolist()))
 
 def run_test():
     import os
@@ -4,6 +4,9 @@ import binascii
 import os
 import platform
 import serial.tools.list_ports
+from concurrent.futures import ThreadPoolExecutor
+
+IS_LINUX = platform.system() == "Linux"
 
 def get_possible_ports():
     ports = []
@@ -13,7 +16,7 @@ def get_possible_ports():
         ports.append(p.device)
     
     # Add common hardcoded ones just in case
-    if platform.system() == "Linux":
+    if IS_LINUX:
         if "/dev/ttyTHS1" not in ports and os.path.exists("/dev/ttyTHS1"):
             ports.append("/dev/ttyTHS1")
         if "/dev/ttyUSB0" not in ports and os.path.exists("/dev/ttyUSB0"):
@@ -21,38 +24,47 @@ def get_possible_ports():
     
     return ports
 
-def dump_serial(port, baudrate=115200, timeout=2):
-    print(f"--- DUMPING {port} @ {baudrate} ---")
+def dump_serial(port, baudrate=115200, timeout=2, log=print):
+    log(f"--- DUMPING {port} @ {baudrate} ---")
     try:
         ser = serial.Serial(port, baudrate, timeout=timeout)
-        print(f"Opened {port}. Reading for 5 seconds...")
+        log(f"Opened {port}. Reading for 5 seconds...")
         
         start_time = time.time()
-        received_data = b""
+        received_data = bytearray()
         
         while time.time() - start_time < 5:
-            if ser.in_waiting > 0:
-                chunk = ser.read(ser.in_waiting)
-                received_data += chunk
+            waiting = ser.in_waiting
+            if waiting > 0:
+                received_data += ser.read(waiting)
+            else:
+                time.sleep(0.001)
                 
         ser.close()
         
         if len(received_data) == 0:
-            print("No data received.")
+            log("No data received.")
         else:
-            print(f"Received {len(received_data)} bytes.")
-            print("First 50 bytes (Hex):")
-            print(binascii.hexlify(received_data[:50]).decode('utf-8'))
+            log(f"Received {len(received_data)} bytes.")
+            log("First 50 bytes (Hex):")
+            log(binascii.hexlify(received_data[:50]).decode('utf-8'))
             
             # Heuristic check for RPLidar (starts with A5)
             if received_data.startswith(b'\xa5'):
-                 print("-> POSSIBLE RPLIDAR DETECTED (starts with 0xA5)")
+                 log("-> POSSIBLE RPLIDAR DETECTED (starts with 0xA5)")
             
             # Heuristic for YDLidar (S4, X4 often use 0xA5 0x5A or similar, but some use 0x54)
             
     except Exception as e:
-        print(f"Error reading {port}: {e}")
-    print("----------------------------------\n")
+        log(f"Error reading {port}: {e}")
+    log("----------------------------------\n")
+
+def probe_port(port, bauds):
+    """Dumps one port at each baud rate in turn; returns the report as text."""
+    lines = []
+    for b in bauds:
+        dump_serial(port, b, log=lines.append)
+    return "\n".join(lines)
 
 if __name__ == "__main__":
     ports = get_possible_ports()
@@ -60,6 +72,8 @@ if __name__ == "__main__":
     
     bauds = [115200, 128000, 230400, 256000]
     
-    for p in ports:
-        for b in bauds:
-            dump_serial(p, b)
+    # A port can only be open at one baud rate at a time, so bauds run in turn
+    # per port while the ports are probed in parallel.
+    with ThreadPoolExecutor(max_workers=max(1, len(ports))) as pool:
+        for report in pool.map(probe_port, ports, [bauds] * len(ports)):
+            print(report)
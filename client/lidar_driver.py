@@ -3,6 +3,21 @@ import time
 import struct
 import threading
 import math
+import numpy as np
+
+# Whole-degree bins shared by every scan array.
+SCAN_ANGLES = np.arange(360, dtype=np.float32)
+
+# Packet layout: AA 55, CT (1), LS (1), FSA (2), LSA (2), CS (2), then LS 2-byte samples.
+PACKET_HEADER = b'\xaa\x55'
+PACKET_HEADER_LEN = 10
+# CT, LS, FSA, LSA, CS following the AA 55 header.
+PACKET_INFO = struct.Struct('<BBHHH')
+# Serial read timeout; short so stop() and errors are noticed within a packet or two.
+READ_TIMEOUT = 0.05
+# Pause after a read/parse error, doubling up to the max while errors repeat.
+ERROR_BACKOFF_MIN = 0.001
+ERROR_BACKOFF_MAX = 0.01
 
 class LidarDriver:
     def __init__(self, port, baudrate=115200):
@@ -10,14 +25,18 @@ class LidarDriver:
         self.baudrate = baudrate
         self.ser = None
         self.scanning = False
-        self.latest_scan = {} # {angle: distance}
-        self.lock = threading.Lock()
+        # Latest reading per whole degree (0 = no reading). The reader thread
+        # replaces the whole array instead of writing into it, so readers can
+        # take the reference without a lock.
+        self.ranges = np.zeros(360, dtype=np.float32)
+        # Bytes read from the port but not yet parsed.
+        self._buf = bytearray()
         self.running = False
         self.thread = None
 
     def connect(self):
         try:
-            self.ser = serial.Serial(self.port, self.baudrate, timeout=1)
+            self.ser = serial.Serial(self.port, self.baudrate, timeout=READ_TIMEOUT)
             print(f"[LiDAR] Opened {self.port} @ {self.baudrate}")
             return True
         except Exception as e:
@@ -45,8 +64,21 @@ class LidarDriver:
         print("[LiDAR] Driver stopped.")
 
     def get_latest_scan(self):
-        with self.lock:
-            return self.latest_scan.copy()
+        """Returns the scan as {angle: distance} for callers that want a dict."""
+        _, dists = self.get_latest_scan_arrays()
+        angles = np.flatnonzero(dists)
+        return dict(zip(angles.tolist(), dists[angles].tolist()))
+
+    def get_latest_scan_arrays(self, out=None):
+        """
+        Returns (angles, distances) as parallel float32 arrays; distance 0 means no reading.
+        Pass a 360-slot float32 array as out to reuse it instead of allocating.
+        """
+        ranges = self.ranges
+        if out is None:
+            return SCAN_ANGLES, ranges.copy()
+        np.copyto(out, ranges)
+        return SCAN_ANGLES, out
 
     def _send_start_cmd(self):
         if not self.ser: return
@@ -69,20 +101,31 @@ class LidarDriver:
         except:
             pass
 
+    def _read_available(self):
+        """Appends whatever the port has buffered (waiting up to the timeout for one byte)."""
+        self._buf += self.ser.read(max(1, self.ser.in_waiting))
+
     def _update_loop(self):
-        temp_points = {}
         last_packet_time = time.time()
+        backoff = ERROR_BACKOFF_MIN
         
         while self.running and self.ser:
             try:
                 points = self._parse_next_packet()
-                if points:
+                if points is None:
+                    self._read_available()
+                elif len(points[0]):
                     last_packet_time = time.time()
-                    with self.lock:
-                        for ang, dist in points:
-                            # Simple filtering
-                            if dist > 0:
-                                self.latest_scan[int(ang)] = dist
+                    angles, dists = points
+                    bins = angles.astype(np.intp) % 360
+                    scan = self.ranges.copy()
+                    # Several samples can land in one degree; keep the closest,
+                    # which is the one that matters for obstacle checks.
+                    scan[bins] = np.inf
+                    np.minimum.at(scan, bins, dists)
+                    # Publish by swapping the reference; a published array is never written again.
+                    self.ranges = scan
+                    backoff = ERROR_BACKOFF_MIN
                 
                 # Reconnect if no data for 2 seconds
                 if time.time() - last_packet_time > 2.0:
@@ -90,47 +133,40 @@ class LidarDriver:
                     self._send_stop_cmd()
                     time.sleep(0.5)
                     self.ser.reset_input_buffer()
+                    self._buf.clear()
                     self._send_start_cmd()
                     last_packet_time = time.time()
                     
             except Exception as e:
                 # print(f"[LiDAR] Parse error: {e}")
-                time.sleep(0.1)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, ERROR_BACKOFF_MAX)
 
     def _parse_next_packet(self):
-        if not self.ser: return None
+        """
+        Parses the next packet from the read buffer. Returns its valid points as
+        (angles, distances) arrays, or None when the buffer does not hold a
+        complete packet yet.
+        """
+        buf = self._buf
         
         # Look for Header AA 55
-        header = b''
-        while len(header) < 2:
-            b = self.ser.read(1)
-            if not b: return None 
-            if len(header) == 0 and b == b'\xaa':
-                header += b
-            elif len(header) == 1:
-                if b == b'\x55':
-                    header += b
-                elif b == b'\xaa':
-                    header = b'\xaa'
-                else:
-                    header = b''
-
-        # Read CT (1) and LS (1)
-        info = self.ser.read(2)
-        if len(info) < 2: return None
-        ls = info[1] # Sample count
+        start = buf.find(PACKET_HEADER)
+        if start < 0:
+            # Keep a trailing AA in case the header is split across reads.
+            del buf[:-1]
+            return None
+        del buf[:start]
+        if len(buf) < PACKET_HEADER_LEN: return None
         
-        # Read FSA (2), LSA (2), CS (2)
-        headers = self.ser.read(6)
-        if len(headers) < 6: return None
+        # CT (1) and LS (1), then FSA (2), LSA (2), CS (2)
+        ct, ls, fsa, lsa, cs = PACKET_INFO.unpack_from(buf, 2)
         
-        fsa = struct.unpack('<H', headers[0:2])[0]
-        lsa = struct.unpack('<H', headers[2:4])[0]
-        
-        # Read Data
-        data_len = ls * 2
-        raw_data = self.ser.read(data_len)
-        if len(raw_data) < data_len: return None
+        # Data
+        end = PACKET_HEADER_LEN + ls * 2
+        if len(buf) < end: return None
+        raw_data = bytes(buf[PACKET_HEADER_LEN:end])
+        del buf[:end]
         
         angle_fsa = (fsa >> 1) / 64.0
         angle_lsa = (lsa >> 1) / 64.0
@@ -138,19 +174,15 @@ class LidarDriver:
         diff = angle_lsa - angle_fsa
         if diff < 0: diff += 360
         
-        packet_points = []
-        for i in range(ls):
-            dist = struct.unpack('<H', raw_data[i*2:(i+1)*2])[0] / 4.0
-            if ls > 1:
-                angle = angle_fsa + (diff / (ls - 1)) * i
-            else:
-                angle = angle_fsa
-            
-            if angle >= 360: angle -= 360
-            if dist > 10: # Min valid range
-                packet_points.append((angle, dist))
-                
-        return packet_points
+        dist = np.frombuffer(raw_data, dtype='<u2') * 0.25
+        if ls > 1:
+            angle = angle_fsa + (diff / (ls - 1)) * np.arange(ls)
+        else:
+            angle = np.full(ls, angle_fsa)
+        angle[angle >= 360] -= 360
+        
+        valid = dist > 10 # Min valid range
+        return angle[valid], dist[valid]
 
 if __name__ == "__main__":
     # Test stub
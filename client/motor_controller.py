@@ -1,4 +1,5 @@
 import time
+import threading
 try:
     from pymycobot import MyAgv
     MOCK_MODE = False
@@ -6,9 +7,20 @@ except ImportError:
     print("pymycobot not found, running in MOCK MODE")
     MOCK_MODE = True
 
+# An unchanged motion command is re-sent after this long (seconds) in case the
+# base has timed it out; identical commands in between skip the serial write.
+RESEND_INTERVAL = 0.5
+
 class MotorController:
-    def __init__(self, port="/dev/ttyS0", baudrate=115200):
+    def __init__(self, port="/dev/ttyS0", baudrate=115200, verbose=True):
         self.mock = MOCK_MODE
+        # Print every command executed; off in production to keep stdout out of the control loop.
+        self.verbose = verbose
+        # Set by interrupt() to cut a timed move short; cleared by resume().
+        self._interrupt = threading.Event()
+        # (command, speed) last written to the base and when.
+        self._last_move = None
+        self._last_sent = 0.0
         if not self.mock:
             try:
                 self.agv = MyAgv(port, baudrate)
@@ -20,11 +32,29 @@ class MotorController:
         else:
             print("MotorController initialized in MOCK MODE")
 
+        if self.mock:
+            # No hardware: skip parsing and dispatch altogether.
+            self.execute_command = self._execute_mock
+
+        # Command name -> motion call taking the clamped speed.
+        self._dispatch = {} if self.mock else {
+            "MOVE_FORWARD": self.agv.go_ahead,
+            "MOVE_BACKWARD": self.agv.retreat,
+            "MOVE_LEFT": self.agv.pan_left,  # Strafe Left (Sideways)
+            "MOVE_RIGHT": self.agv.pan_right,  # Strafe Right (Sideways)
+            "TURN_LEFT": self.agv.counterclockwise_rotation,  # Rotate in place (Counter-Clockwise)
+            "TURN_RIGHT": self.agv.clockwise_rotation,  # Rotate in place (Clockwise)
+            "STOP": lambda _speed: self.agv.stop(),
+        }
+
     def execute_command(self, cmd_data):
         """
         Executes a command dictionary.
         Format: {"command": "MOVE_FORWARD", "speed": 50, "duration": 1.0}
         """
+        # Interrupted before the job even started: it has already been superseded.
+        if self._interrupt.is_set():
+            return
         command = cmd_data.get("command")
         raw_speed = int(cmd_data.get("speed", 0))
         
@@ -40,40 +70,48 @@ class MotorController:
         else:
             speed = 0
 
-        print(f"Executing: {command} at speed {speed} (raw: {raw_speed})")
-
-        if self.mock:
-            return
+        if self.verbose:
+            print(f"Executing: {command} at speed {speed} (raw: {raw_speed})")
 
-        if command == "MOVE_FORWARD":
-            self.agv.go_ahead(speed)
-        elif command == "MOVE_BACKWARD":
-            self.agv.retreat(speed)
-        elif command == "MOVE_LEFT":
-            # Strafe Left (Sideways)
-            self.agv.pan_left(speed)
-        elif command == "MOVE_RIGHT":
-            # Strafe Right (Sideways)
-            self.agv.pan_right(speed)
-        elif command == "TURN_LEFT":
-            # Rotate in place (Counter-Clockwise)
-            self.agv.counterclockwise_rotation(speed)
-        elif command == "TURN_RIGHT":
-            # Rotate in place (Clockwise)
-            self.agv.clockwise_rotation(speed)
-        elif command == "STOP":
-            self.agv.stop()
-        else:
+        move = self._dispatch.get(command)
+        if move is None:
             print(f"Unknown command: {command}")
             return
+        # STOP always goes out; a repeated motion is only re-asserted periodically.
+        now = time.monotonic()
+        if command == "STOP" or (command, speed) != self._last_move or now - self._last_sent > RESEND_INTERVAL:
+            move(speed)
+            self._last_move = (command, speed)
+            self._last_sent = now
 
         # Execute duration
         duration = float(cmd_data.get("duration", 0))
         if duration > 0 and command != "STOP":
-            time.sleep(duration)
-            self.stop()
+            # An interrupted move is left running for the next command to replace.
+            if not self._interrupt.wait(duration):
+                self.stop()
+
+    def _execute_mock(self, cmd_data):
+        """execute_command in MOCK MODE: only reports the command."""
+        if self.verbose:
+            print(f"Executing (mock): {cmd_data.get('command')} at speed {cmd_data.get('speed', 0)}")
+
+    def interrupt(self):
+        """Ends the duration wait of a running execute_command early, without stopping."""
+        self._interrupt.set()
+
+    def resume(self):
+        """
+        Re-arms execute_command after interrupt(). Call it before submitting the
+        next command, not from the job, so an interrupt() that lands before the
+        job starts is not lost.
+        """
+        self._interrupt.clear()
 
     def stop(self):
-        print("Stopping motors...")
+        if self.verbose:
+            print("Stopping motors...")
         if not self.mock:
             self.agv.stop()
+            self._last_move = ("STOP", 0)
+            self._last_sent = time.monotonic()
@@ -5,6 +5,8 @@ import platform
 import serial.tools.list_ports
 from rplidar import RPLidar
 
+SYSTEM = platform.system()
+
 def get_lidar_port():
     """
     Attempt to find the LiDAR port based on the operating system.
@@ -18,10 +20,10 @@ def get_lidar_port():
         print(f" - {p.device}: {p.description}")
         # Try to guess common lidar ports
         if "CP210" in p.description or "USB" in p.description:
-            if platform.system() == "Linux" and "ttyUSB" in p.device:
+            if SYSTEM == "Linux" and "ttyUSB" in p.device:
                 detected_port = p.device
 
-    system = platform.system()
+    system = SYSTEM
     if system == "Windows":
         return "COM3"  # Common default, user may need to change
     elif system == "Linux":
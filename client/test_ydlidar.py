@@ -1,4 +1,5 @@
 import time
+import numpy as np
 import PyLidar3
 import platform
 import os
@@ -37,22 +38,24 @@ def run_test():
             # StartScanning returns a generator yielding dicts
             for data in lidar.StartScanning():
                 if count % 10 == 0:
+                     angles = np.fromiter(data.keys(), dtype=np.int32, count=len(data))
+                     dists = np.fromiter(data.values(), dtype=np.float32, count=len(data))
                      # Filter out zero/invalid distances
-                     valid_points = {k: v for k, v in data.items() if v > 0}
+                     valid = dists > 0
+                     valid_angles, valid_dists = angles[valid], dists[valid]
                      
-                     print(f"Scan {count}: {len(data)} total points, {len(valid_points)} valid points")
+                     # Build the report and write it in one go; the scan generator is paused meanwhile.
+                     lines = [f"Scan {count}: {len(data)} total points, {valid_dists.size} valid points"]
                      
-                     if valid_points:
-                         min_dist = min(valid_points.values())
-                         max_dist = max(valid_points.values())
-                         print(f"  Range: {min_dist:.1f}mm - {max_dist:.1f}mm")
+                     if valid_dists.size:
+                         lines.append(f"  Range: {valid_dists.min():.1f}mm - {valid_dists.max():.1f}mm")
                          
                          # Print 3 random samples from valid points
-                         sample_angles = list(valid_points.keys())[:3]
-                         for ang in sample_angles:
-                             print(f"  Angle: {ang}°, Dist: {valid_points[ang]}mm")
+                         for ang, dist in zip(valid_angles[:3], valid_dists[:3]):
+                             lines.append(f"  Angle: {ang}°, Dist: {dist:g}mm")
                      else:
-                         print("  No valid points detected yet (spinning up?)")
+                         lines.append("  No valid points detected yet (spinning up?)")
+                     sys.stdout.write("\n".join(lines) + "\n")
                 
                 count += 1
                 if count > 100: # Run for about 100 scans to be sure
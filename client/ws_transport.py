@@ -0,0 +1,118 @@
+import asyncio
+import contextlib
+import socket
+import websockets
+
+# picows does websocket framing and masking in C; optional, falls back to websockets.
+try:
+    from picows import ws_connect, WSListener, WSMsgType, WSCloseCode, WSError
+    PICOWS_AVAILABLE = True
+except ImportError:
+    PICOWS_AVAILABLE = False
+
+MAX_MESSAGE_SIZE = 2**23
+# Keepalive pings: a link that stays silent this long after a ping is treated as dead,
+# which ends recv() with ConnectionLost and lets the caller reconnect (seconds).
+PING_INTERVAL = 20
+PING_TIMEOUT = 20
+
+
+class ConnectionLost(ConnectionError):
+    """The websocket to the backend could not be opened or was closed."""
+
+
+def _set_nodelay(transport):
+    """Disables Nagle so a frame is sent as soon as it is written."""
+    sock = transport.get_extra_info("socket")
+    if sock is not None and sock.family in (socket.AF_INET, socket.AF_INET6):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+if PICOWS_AVAILABLE:
+    class _QueueListener(WSListener):
+        """Reassembles incoming messages and hands them to an asyncio.Queue."""
+        def __init__(self):
+            self.messages = asyncio.Queue()
+            self._parts = []
+
+        def on_ws_frame(self, transport, frame):
+            if frame.msg_type == WSMsgType.CLOSE:
+                transport.send_close(frame.get_close_code())
+                transport.disconnect()
+                return
+            if frame.msg_type not in (WSMsgType.TEXT, WSMsgType.BINARY, WSMsgType.CONTINUATION):
+                return
+            self._parts.append(frame.get_payload_as_bytes())
+            if frame.fin:
+                self.messages.put_nowait(b"".join(self._parts))
+                self._parts = []
+
+        def on_ws_disconnected(self, transport):
+            self.messages.put_nowait(None)
+
+
+    class PicowsConnection:
+        def __init__(self, transport, listener):
+            self._transport = transport
+            self._listener = listener
+
+        async def send(self, data):
+            self._transport.send(WSMsgType.BINARY, data)
+
+        async def recv(self):
+            message = await self._listener.messages.get()
+            if message is None:
+                raise ConnectionLost()
+            return message
+
+        def close(self):
+            self._transport.send_close(WSCloseCode.OK)
+            self._transport.disconnect()
+
+
+class WebsocketsConnection:
+    def __init__(self, websocket):
+        self._websocket = websocket
+
+    async def send(self, data):
+        try:
+            await self._websocket.send(data)
+        except websockets.exceptions.ConnectionClosed as e:
+            raise ConnectionLost() from e
+
+    async def recv(self):
+        try:
+            return await self._websocket.recv()
+        except websockets.exceptions.ConnectionClosed as e:
+            raise ConnectionLost() from e
+
+
+@contextlib.asynccontextmanager
+async def connect(url, use_picows=True):
+    """Opens a websocket to the backend; yields an object with async send()/recv()."""
+    if use_picows and PICOWS_AVAILABLE:
+        try:
+            transport, listener = await ws_connect(
+                _QueueListener, url, max_frame_size=MAX_MESSAGE_SIZE, enable_auto_ping=True,
+                auto_ping_idle_timeout=PING_INTERVAL, auto_ping_reply_timeout=PING_TIMEOUT
+            )
+        except WSError as e:
+            raise ConnectionLost() from e
+        _set_nodelay(transport.underlying_transport)
+        connection = PicowsConnection(transport, listener)
+        try:
+            yield connection
+        finally:
+            connection.close()
+        return
+
+    # JPEG payloads are already entropy-coded, so per-message deflate only burns CPU.
+    try:
+        async with websockets.connect(
+            url, compression=None, max_queue=None, max_size=MAX_MESSAGE_SIZE, write_limit=2**20,
+            ping_interval=PING_INTERVAL, ping_timeout=PING_TIMEOUT
+        ) as websocket:
+            _set_nodelay(websocket.transport)
+            yield WebsocketsConnection(websocket)
+    except websockets.exceptions.InvalidHandshake as e:
+        raise ConnectionLost() from e